@@ -1 +1 @@
-from airgym.envs.airgym_v1 import AirGym
\ No newline at end of file
+from airgym.envs.airgym_v1 import AirGym, NotXPlaneRunning, check_connections
\ No newline at end of file
@@ -1,12 +1,11 @@
 # AirGym: A Reinforcement Learning Environment 🚀, GPL-3.0 License
 
 import gym
+import selectors
 
 import numpy as np
 
-from time import sleep
-
-from scipy.spatial.distance import pdist
+from time import sleep, perf_counter
 
 from airgym.x_plane_connect import XPlaneConnect
 from airgym.spaces_definition import action_space, observation_space
@@ -16,6 +15,43 @@ class NotXPlaneRunning(Exception):
     pass
 
 
+def check_connections(envs, timeout: float = 3.6):
+    """Check that X-Plane answers for many environments at once.
+
+    The probes are sent to every simulator first and the answers are awaited together,
+    so bringing up many environments costs at most one timeout instead of one per environment.
+    Create the environments with `check_connection=False` to skip their own blocking probe.
+    Host lookups are only cached within a process: when the environments live in many
+    short-lived processes, resolve the host once in the parent (e.g. with `resolveHost`)
+    and pass the IP address to the workers.
+
+    Args:
+        envs (list): The environments to check, possibly wrapped.
+        timeout (float, optional): The overall timeout, in seconds. Defaults to 3.6.
+
+    Raises:
+        NotXPlaneRunning: If X-Plane did not answer for some environments."""
+    pending = {}
+    for env in envs:
+        xp = env.unwrapped.xp
+        xp.requestDREFs(["sim/test/test_float"])
+        pending[xp.socket] = xp
+    deadline = perf_counter() + timeout
+    with selectors.DefaultSelector() as selector:
+        for sock in pending:
+            selector.register(sock, selectors.EVENT_READ)
+        while pending:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                selector.unregister(key.fileobj)
+                pending.pop(key.fileobj).readDREFs()
+    if pending:
+        raise NotXPlaneRunning("X-Plane is not running at " + ", ".join(
+            "{0}:{1}".format(*xp.xpDst) for xp in pending.values()) + ".")
+
+
 class AirGym(gym.Env):
     """The AirGym environment.
 
@@ -23,17 +59,41 @@ class AirGym(gym.Env):
         action_space (gym.spaces.Box): The action space.
         observation_space (gym.spaces.Box): The observation space.
         xp (XPlaneConnect): The X-Plane connection.
+        obs_rms (RunningMeanStd): The running statistics of the observations, None if not normalized.
+        ret_rms (RunningMeanStd): The running statistics of the discounted returns, None if rewards are not normalized.
+        sim_time (float): The sim-clock time of the last observation, in seconds.
+        latency (float): The smoothed one-way delay estimate of the X-Plane connection, in seconds.
+        target_state (np.ndarray): The state the agent is rewarded to reach.
     """
 
     metadata = {"render.modes": ["human"]}
 
-    def __init__(self, address_ip: str = "0.0.0.0", port: int = 49009, timeout: int = 3600):
+    # Target psi at 120° and velocity_x at 60 m/s
+    target_state = np.array([0, 0, 120, 60, 0, 0, 0, 0, 0], dtype=np.float64)
+
+    def __init__(self, address_ip: str = "0.0.0.0", port: int = 49009, timeout: int = 3600,
+                 normalize_obs: bool = False, normalize_reward: bool = False,
+                 obs_rms: "RunningMeanStd" = None, ret_rms: "RunningMeanStd" = None,
+                 clip: float = 10.0, gamma: float = 0.99, extrapolate_obs: bool = False,
+                 check_connection: bool = True, render_fps: float = 10.0, render_points: int = 500):
         """Initialize the environment.
 
         Args:
             address_ip (str, optional): The IP address of the X-Plane computer. Defaults to localhost.
             port (int, optional): The port of the X-Plane computer. Defaults to 49009.
             timeout (int, optional): The timeout of the X-Plane connection. Defaults to 3600.
+            normalize_obs (bool, optional): Normalize the observations with running statistics. Defaults to False.
+            normalize_reward (bool, optional): Scale the rewards by the running std of the discounted return. Defaults to False.
+            obs_rms (RunningMeanStd, optional): The observation statistics to use, e.g. backed by a shared buffer. Defaults to None.
+            ret_rms (RunningMeanStd, optional): The return statistics to use, e.g. backed by a shared buffer. Defaults to None.
+            clip (float, optional): The absolute bound of the normalized values. Defaults to 10.0.
+            gamma (float, optional): The discount factor of the return used to scale rewards. Defaults to 0.99.
+            extrapolate_obs (bool, optional): Extrapolate the observation to the moment the next action
+                is applied in X-Plane. Defaults to False.
+            check_connection (bool, optional): Probe X-Plane before returning. Disable it to bring up many
+                environments at once and check them with `check_connections`. Defaults to True.
+            render_fps (float, optional): The maximum rate at which `render` draws in X-Plane. Defaults to 10.0.
+            render_points (int, optional): The number of latest positions drawn as the trajectory. Defaults to 500.
 
         Raises:
             NotXPlaneRunning: If X-Plane is not running."""
@@ -42,9 +102,43 @@ class AirGym(gym.Env):
         self.action_space = action_space()
         # Set observation space to 6 dimensions (phi, theta, vz)
         self.observation_space = observation_space()
+        # Running statistics used for the normalization
+        self.normalize_obs = normalize_obs
+        self.normalize_reward = normalize_reward
+        self.obs_rms = obs_rms
+        self.ret_rms = ret_rms
+        # Only load the normalization when it is used, to keep the startup light
+        if normalize_obs or normalize_reward:
+            from airgym.normalization import RunningMeanStd
+            if normalize_obs and self.obs_rms is None:
+                self.obs_rms = RunningMeanStd(shape=self.observation_space.shape)
+            if normalize_reward and self.ret_rms is None:
+                self.ret_rms = RunningMeanStd(shape=())
+        self.clip = clip
+        self.gamma = gamma
+        self._return = 0.0
+        # Timing of the observations
+        self.extrapolate_obs = extrapolate_obs
+        self.sim_time = None
+        self.sim_dt = 0.0
+        self.latency = 0.0
+        self._compute_time = 0.0
+        self._received_at = None
+        self._prev_obs = None
+        # Rendering, started on the first call to `render`
+        self.render_fps = render_fps
+        self.render_points = render_points
+        self.position = None
+        self._renderer = None
+        self._steps = 0
+        self._reward = 0.0
         # Store the X-Plane connection
+        self.address_ip = address_ip
+        self.port = port
         self.xp = XPlaneConnect(address_ip, port, 0, timeout)
         # Initiate X-Plane
+        if not check_connection:
+            return
         try:
             self.xp.getDREF("sim/test/test_float")
         except:
@@ -53,10 +147,15 @@ class AirGym(gym.Env):
     def _get_obs(self):
         """Get the observation from X-Plane.
 
+        The sim-clock time is fetched in the same request and stored in `sim_time`, and
+        the request round trip updates the one-way delay estimate `latency`. When rendering,
+        the position of the aircraft is fetched as well and stored in `position`.
+
         Returns:
             np.ndarray: The observation."""
-        # Get the observation from X-Plane
-        raw_data = self.xp.getDREFs([
+        # Get the observation and the sim-clock time from X-Plane in one request
+        sent_at = perf_counter()
+        drefs = [
             "sim/flightmodel/position/phi",
             "sim/flightmodel/position/theta",
             "sim/flightmodel/position/psi",
@@ -65,9 +164,52 @@ class AirGym(gym.Env):
             "sim/flightmodel/position/local_vz",
             "sim/flightmodel/position/P",
             "sim/flightmodel/position/Q",
-            "sim/flightmodel/position/R",]
-        )
-        return np.array([item[0] for item in raw_data], dtype=np.float64)
+            "sim/flightmodel/position/R",
+            "sim/time/total_running_time_sec",
+        ]
+        if self._renderer is not None:
+            drefs += [
+                "sim/flightmodel/position/latitude",
+                "sim/flightmodel/position/longitude",
+                "sim/flightmodel/position/elevation",
+            ]
+        raw_data = self.xp.getDREFs(drefs)
+        self._received_at = perf_counter()
+        # Half the round trip, smoothed to absorb the UDP jitter
+        self.latency += 0.1 * ((self._received_at - sent_at) / 2 - self.latency)
+        sim_time = raw_data[9][0]
+        self.sim_dt = sim_time - self.sim_time if self.sim_time is not None else 0.0
+        self.sim_time = sim_time
+        if self._renderer is not None:
+            self.position = tuple(item[0] for item in raw_data[10:13])
+        return np.array([item[0] for item in raw_data[:9]], dtype=np.float64)
+
+    def _extrapolate_obs(self, obs: np.ndarray):
+        """Extrapolate the observation to the moment the next action is applied.
+
+        The horizon is the delay of the observation, the time spent by the agent before
+        the previous action, and the delay of the action. Angles are moved along the P/Q/R
+        rates, velocities and rates along their change since the previous observation.
+        Adding the body rates to the Euler angles is a small-angle approximation. The angles
+        are then wrapped back to the ranges X-Plane reports: phi in [-180, 180), theta in
+        [-90, 90] and psi in [0, 360).
+
+        Args:
+            obs (np.ndarray): The raw observation.
+
+        Returns:
+            np.ndarray: The extrapolated observation."""
+        if not self.extrapolate_obs:
+            return obs
+        prev_obs, self._prev_obs = self._prev_obs, obs.copy()
+        horizon = 2 * self.latency + self._compute_time
+        obs[0:3] += obs[6:9] * horizon
+        obs[0] = np.mod(obs[0] + 180, 360) - 180
+        obs[1] = np.clip(obs[1], -90, 90)
+        obs[2] = np.mod(obs[2], 360)
+        if prev_obs is not None and self.sim_dt > 0:
+            obs[3:9] += (obs[3:9] - prev_obs[3:9]) * (horizon / self.sim_dt)
+        return obs
 
     def _compute_reward(self, obs: np.ndarray, target: np.ndarray, sigma: float = 0.45):
         """Compute the reward.
@@ -79,10 +221,37 @@ class AirGym(gym.Env):
 
         Returns:
             float: The reward."""
-        # Calculate the distance between the observation and the target
-        distance = pdist(np.array([obs, target]), 'cosine')
+        # Calculate the cosine distance between the observation and the target
+        distance = 1.0 - np.dot(obs, target) / (np.linalg.norm(obs) * np.linalg.norm(target))
         # Calculate the reward
-        return np.exp(-distance ** 2 / sigma ** 2)[0]
+        return np.exp(-distance ** 2 / sigma ** 2)
+
+    def _normalize_obs(self, obs: np.ndarray):
+        """Update the observation statistics and normalize the observation in place.
+
+        Args:
+            obs (np.ndarray): The raw observation.
+
+        Returns:
+            np.ndarray: The normalized observation."""
+        if not self.normalize_obs:
+            return obs
+        self.obs_rms.update(obs)
+        return self.obs_rms.normalize(obs, clip=self.clip, out=obs)
+
+    def _normalize_reward(self, reward: float):
+        """Update the return statistics and scale the reward.
+
+        Args:
+            reward (float): The raw reward.
+
+        Returns:
+            float: The scaled reward."""
+        if not self.normalize_reward:
+            return reward
+        self._return = self._return * self.gamma + reward
+        self.ret_rms.update(self._return)
+        return self.ret_rms.scale(reward, clip=self.clip)
 
     def reset(self):
         """Reset the environment to the initial state.
@@ -90,6 +259,21 @@ class AirGym(gym.Env):
         Returns:
             np.ndarray: The initial obs
         """
+        return self._normalize_obs(self._extrapolate_obs(self._reset()))
+
+    def _reset(self):
+        """Put the aircraft back to the initial state.
+
+        Returns:
+            np.ndarray: The raw initial observation."""
+        # The sim clock and the state jump, forget the previous observation
+        self.sim_time = None
+        self._prev_obs = None
+        # Start a new discounted return and a new trajectory on the HUD
+        self._return = 0.0
+        self._steps = 0
+        if self._renderer is not None:
+            self._renderer.clear_points()
         drefs = [
             "sim/time/local_time_sec",
             "sim/flightmodel/position/latitude",
@@ -124,8 +308,12 @@ class AirGym(gym.Env):
             np.ndarray: The observation.
             float: The reward.
             bool: If the episode is done.
-            dict: The info.
+            dict: The info, with the sim-clock time of the observation, the sim time elapsed
+                since the previous one and the one-way delay estimate.
         """
+        # Measure the time spent by the agent since the last observation
+        if self._received_at is not None:
+            self._compute_time += 0.1 * (perf_counter() - self._received_at - self._compute_time)
         # Set the action to the aircraft
         self.xp.sendCTRL(action)
         # Add a delay to make sure the action is sent
@@ -135,11 +323,9 @@ class AirGym(gym.Env):
             obs = self._get_obs()
         except:
             # If the aircraft is out of the simulation, reset the environment
-            obs = self.reset()
-        # Calculate the reward based on the observation and the target psi at 120°
-        # and velocity_x at 60 m/s
-        target_state = np.array(
-            [0, 0, 120, 60, 0, 0, 0, 0, 0], dtype=np.float64)
+            obs = self._reset()
+        # Calculate the reward based on the observation and the target state
+        target_state = self.target_state
         # If the aircraft has a psi between 119° and 121° and a velocity between 59 m/s and 61 m/s
         # then the reward is high, otherwise penalize the agent
         if np.sum(abs(obs - target_state)) < (obs.shape[0] * 1.5):
@@ -147,15 +333,36 @@ class AirGym(gym.Env):
         else:
             reward = - self._compute_reward(obs, target_state)
 
-        return obs, reward, False, {}
+        self._steps += 1
+        self._reward = reward
+        info = {"sim_time": self.sim_time, "sim_dt": self.sim_dt, "latency": self.latency}
+        obs = self._normalize_obs(self._extrapolate_obs(obs))
+        return obs, self._normalize_reward(reward), False, info
 
     def render(self, mode: str = "human"):
         """Render the environment.
 
+        The HUD text and the trajectory waypoint are only queued, a background thread
+        draws them in X-Plane at most `render_fps` times per second.
+
         Args:
-            mode (str, optional): The mode to render the environment. Defaults to "human"."""
-        NotImplementedError()
+            mode (str, optional): The mode to render the environment. Defaults to "human".
+
+        Raises:
+            NotImplementedError: If the mode is not supported."""
+        if mode != "human":
+            raise NotImplementedError("Render mode " + str(mode) + " is not supported.")
+        if self._renderer is None:
+            from airgym.render import Renderer
+            self._renderer = Renderer(self.address_ip, self.port, self.render_fps, self.render_points)
+        self._renderer.queue_text("step {0}  reward {1:.3f}  target heading {2:.0f} deg  speed {3:.0f} m/s".format(
+            self._steps, self._reward, self.target_state[2], self.target_state[3]))
+        if self.position is not None:
+            self._renderer.queue_point(*self.position)
 
     def close(self):
         """Close the environment."""
+        if self._renderer is not None:
+            self._renderer.close()
+            self._renderer = None
         self.xp.close()
@@ -0,0 +1,104 @@
+# AirGym: A Reinforcement Learning Environment 🚀, GPL-3.0 License
+
+import socket
+import struct
+import threading
+
+from time import perf_counter
+
+
+class FakeXPlane(object):
+    """A stand-in for the X-Plane Connect plugin, to run `AirGym` on localhost.
+
+    It answers GETD requests from a table of dataref values, stores the values of DREF
+    messages and ignores every other message (CTRL, TEXT, WYPT...). The sim clock follows
+    the wall clock. Every `fail_every` observation request gets a truncated answer, so the
+    reset path of `AirGym.step` is exercised too.
+
+    Attributes:
+        address (tuple): The (host, port) the environments must connect to.
+        values (dict): The current value of each dataref, 0 if missing.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_every: int = 0):
+        """Start answering on a UDP socket.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on, 0 for any free port. Defaults to 0.
+            fail_every (int, optional): Truncate one observation answer every `fail_every`, 0 never. Defaults to 0.
+        """
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._socket.bind((host, port))
+        self._socket.settimeout(0.5)
+        self.address = self._socket.getsockname()
+        self.values = {}
+        self.fail_every = fail_every
+        self._requests = 0
+        self._start = perf_counter()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Answer the requests until the stand-in is closed."""
+        while not self._closed:
+            try:
+                buffer, client = self._socket.recvfrom(16384)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if buffer[:4] == b"GETD":
+                self._socket.sendto(self._answer(buffer), client)
+            elif buffer[:4] == b"DREF":
+                self._store(buffer)
+
+    def _answer(self, buffer: bytes):
+        """Build the answer to a GETD request.
+
+        Args:
+            buffer (bytes): The request.
+
+        Returns:
+            bytes: The RESP message."""
+        count = buffer[5]
+        offset = 6
+        values = []
+        for _ in range(count):
+            size = buffer[offset]
+            dref = buffer[offset + 1:offset + 1 + size].decode()
+            offset += 1 + size
+            if dref == "sim/time/total_running_time_sec":
+                values.append(perf_counter() - self._start)
+            else:
+                values.append(self.values.get(dref, 0.0))
+        if count > 1:
+            # Only the observations may fail, not the connection probes
+            self._requests += 1
+            if self.fail_every and self._requests % self.fail_every == 0:
+                return struct.pack(b"<4sx", b"RESP")
+        answer = struct.pack(b"<4sxB", b"RESP", count)
+        for value in values:
+            answer += struct.pack(b"<Bf", 1, value)
+        return answer
+
+    def _store(self, buffer: bytes):
+        """Store the values of a DREF message.
+
+        Args:
+            buffer (bytes): The message."""
+        offset = 5
+        while offset < len(buffer):
+            size = buffer[offset]
+            dref = buffer[offset + 1:offset + 1 + size].decode()
+            offset += 1 + size
+            count = buffer[offset]
+            self.values[dref] = struct.unpack_from("<{0:d}f".format(count).encode(), buffer, offset + 1)[0]
+            offset += 1 + 4 * count
+
+    def close(self):
+        """Stop answering and close the socket."""
+        self._closed = True
+        self._thread.join()
+        self._socket.close()
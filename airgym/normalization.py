@@ -0,0 +1,203 @@
+# AirGym: A Reinforcement Learning Environment 🚀, GPL-3.0 License
+
+import threading
+import multiprocessing
+
+import numpy as np
+
+
+class RunningMeanStd(object):
+    """Running mean and variance, updated with Welford/Chan parallel updates.
+
+    The mean, the variance and the sample count are kept in a single flat float64
+    buffer laid out as ``[mean..., var..., count]``. The buffer can be any object
+    supporting the buffer protocol (e.g. ``multiprocessing.RawArray('d', n)`` or
+    ``multiprocessing.shared_memory.SharedMemory(...).buf``), so several workers
+    can share the same statistics. Updates read and rewrite the whole buffer, so
+    workers sharing a buffer must also share a `lock`, e.g. ``multiprocessing.Lock()``.
+    Alternatively, each worker keeps private statistics that the learner combines
+    with `merge`.
+
+    Attributes:
+        shape (tuple): The shape of a single sample.
+        mean (np.ndarray): A view on the running mean.
+        var (np.ndarray): A view on the running variance.
+        frozen (bool): If True, `update` leaves the statistics untouched.
+    """
+
+    def __init__(self, shape: tuple = (), epsilon: float = 1e-4, buffer=None, lock=None):
+        """Initialize the running statistics.
+
+        Args:
+            shape (tuple, optional): The shape of a single sample. Defaults to ().
+            epsilon (float, optional): The initial count, avoids a division by zero. Defaults to 1e-4.
+            buffer (optional): A float64 buffer of `buffer_size(shape)` items to store the statistics in,
+                initialized by `create_buffer`. If None, a private buffer is allocated. Defaults to None.
+            lock (optional): The lock held while the buffer is read or written, shared by every owner
+                of the buffer. If None, a private lock is used. Defaults to None.
+        """
+        self.shape = tuple(shape)
+        self._size = int(np.prod(self.shape, dtype=np.int64))
+        self.lock = lock if lock is not None else threading.Lock()
+        if buffer is None:
+            self.buffer = np.empty(self.buffer_size(self.shape), dtype=np.float64)
+            self._init_buffer(self.buffer, self._size, epsilon)
+        else:
+            # Wrap the buffer without copying it, so updates are visible to every owner
+            self.buffer = np.frombuffer(buffer, dtype=np.float64, count=self.buffer_size(self.shape))
+        self.mean = self.buffer[:self._size].reshape(self.shape)
+        self.var = self.buffer[self._size:2 * self._size].reshape(self.shape)
+        self.frozen = False
+
+    @staticmethod
+    def buffer_size(shape: tuple = ()):
+        """Get the number of float64 items needed to store the statistics.
+
+        Args:
+            shape (tuple, optional): The shape of a single sample. Defaults to ().
+
+        Returns:
+            int: The buffer size."""
+        return 2 * int(np.prod(shape, dtype=np.int64)) + 1
+
+    @staticmethod
+    def _init_buffer(buffer: np.ndarray, size: int, epsilon: float):
+        """Write the initial statistics: zero mean, unit variance and a count of `epsilon`.
+
+        Args:
+            buffer (np.ndarray): The buffer to initialize.
+            size (int): The number of items of a single sample.
+            epsilon (float): The initial count."""
+        buffer[:size] = 0.0
+        buffer[size:2 * size] = 1.0
+        buffer[-1] = epsilon
+
+    @classmethod
+    def create_buffer(cls, shape: tuple = (), epsilon: float = 1e-4):
+        """Allocate a shared buffer initialized like a private one.
+
+        Args:
+            shape (tuple, optional): The shape of a single sample. Defaults to ().
+            epsilon (float, optional): The initial count. Defaults to 1e-4.
+
+        Returns:
+            multiprocessing.RawArray: The shared buffer."""
+        buffer = multiprocessing.RawArray("d", cls.buffer_size(shape))
+        cls._init_buffer(np.frombuffer(buffer, dtype=np.float64), int(np.prod(shape, dtype=np.int64)), epsilon)
+        return buffer
+
+    @property
+    def count(self):
+        """float: The number of samples seen so far."""
+        return self.buffer[-1]
+
+    @count.setter
+    def count(self, value: float):
+        self.buffer[-1] = value
+
+    def update(self, x: np.ndarray):
+        """Update the statistics with a sample or a batch of samples.
+
+        Args:
+            x (np.ndarray): A sample of shape `shape` or a batch of shape `(n, *shape)`."""
+        if self.frozen:
+            return
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == len(self.shape):
+            with self.lock:
+                # Single sample: plain Welford update, in place
+                self.count += 1
+                delta = x - self.mean
+                self.mean += delta / self.count
+                self.var += (delta * (x - self.mean) - self.var) / self.count
+        else:
+            batch = x.reshape((-1,) + self.shape)
+            batch_mean, batch_var = batch.mean(axis=0), batch.var(axis=0)
+            with self.lock:
+                self._update_from_moments(batch_mean, batch_var, batch.shape[0])
+
+    def merge(self, other: "RunningMeanStd"):
+        """Merge the statistics of another instance into this one.
+
+        Args:
+            other (RunningMeanStd): The statistics to merge, e.g. from another worker."""
+        if other.shape != self.shape:
+            raise ValueError("Cannot merge statistics of different shapes.")
+        # Snapshot the other statistics first, so the two locks are never held together
+        state = other.state_dict()
+        with self.lock:
+            self._update_from_moments(state["mean"], state["var"], state["count"])
+
+    def _update_from_moments(self, batch_mean: np.ndarray, batch_var: np.ndarray, batch_count: float):
+        """Combine the statistics with the moments of another set of samples.
+
+        Args:
+            batch_mean (np.ndarray): The mean of the other samples.
+            batch_var (np.ndarray): The variance of the other samples.
+            batch_count (float): The number of other samples."""
+        total_count = self.count + batch_count
+        if total_count == 0:
+            return
+        delta = batch_mean - self.mean
+        # The variance update needs the count before the mean is moved
+        self.var *= self.count / total_count
+        self.var += batch_var * (batch_count / total_count)
+        self.var += np.square(delta) * (self.count * batch_count / total_count ** 2)
+        self.mean += delta * (batch_count / total_count)
+        self.count = total_count
+
+    def normalize(self, x: np.ndarray, clip: float = 10.0, epsilon: float = 1e-8, out: np.ndarray = None):
+        """Normalize a sample or a batch of samples with the current statistics.
+
+        Args:
+            x (np.ndarray): The sample(s) to normalize.
+            clip (float, optional): The absolute bound of the normalized values. Defaults to 10.0.
+            epsilon (float, optional): Added to the variance for numerical stability. Defaults to 1e-8.
+            out (np.ndarray, optional): The array to write the result to, may be `x` itself. Defaults to None.
+
+        Returns:
+            np.ndarray: The normalized sample(s)."""
+        with self.lock:
+            out = np.subtract(x, self.mean, out=out)
+            out /= np.sqrt(self.var + epsilon)
+        return np.clip(out, -clip, clip, out=out)
+
+    def scale(self, x: float, clip: float = 10.0, epsilon: float = 1e-8):
+        """Scale a value by the running standard deviation without centering it.
+
+        Args:
+            x (float): The value to scale, e.g. a reward.
+            clip (float, optional): The absolute bound of the scaled value. Defaults to 10.0.
+            epsilon (float, optional): Added to the variance for numerical stability. Defaults to 1e-8.
+
+        Returns:
+            float: The scaled value."""
+        with self.lock:
+            std = np.sqrt(self.var + epsilon)
+        return float(np.clip(x / std, -clip, clip))
+
+    def freeze(self):
+        """Stop updating the statistics, e.g. for evaluation."""
+        self.frozen = True
+
+    def unfreeze(self):
+        """Resume updating the statistics."""
+        self.frozen = False
+
+    def state_dict(self):
+        """Get a serializable copy of the statistics.
+
+        Returns:
+            dict: The mean, the variance and the count."""
+        with self.lock:
+            return {"mean": self.mean.copy(), "var": self.var.copy(), "count": float(self.count)}
+
+    def load_state_dict(self, state: dict):
+        """Load statistics previously returned by `state_dict`.
+
+        Args:
+            state (dict): The mean, the variance and the count."""
+        with self.lock:
+            self.mean[...] = state["mean"]
+            self.var[...] = state["var"]
+            self.count = state["count"]
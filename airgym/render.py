@@ -0,0 +1,131 @@
+# AirGym: A Reinforcement Learning Environment 🚀, GPL-3.0 License
+
+import threading
+
+from collections import deque
+from time import sleep
+
+from airgym.x_plane_connect import XPlaneConnect
+
+# sendWYPT packs the number of floats in one byte
+MAX_POINTS_PER_MESSAGE = 255 // 3
+
+
+class Renderer(object):
+    """Background sender of HUD text and trajectory waypoints to X-Plane.
+
+    The environment only queues what must be drawn; a daemon thread flushes the queue
+    on its own socket at most `max_rate` times per second. Texts queued between two
+    flushes are coalesced into the latest one, and the waypoints queued between two
+    flushes are sent together. The trajectory keeps the latest `max_points` waypoints,
+    the oldest ones are removed from X-Plane as new ones are drawn.
+
+    Attributes:
+        xp (XPlaneConnect): The X-Plane connection used for drawing.
+        max_rate (float): The maximum number of flushes per second.
+        max_points (int): The maximum number of waypoints drawn at once.
+    """
+
+    def __init__(self, address_ip: str = "0.0.0.0", port: int = 49009, max_rate: float = 10.0,
+                 max_points: int = 500):
+        """Initialize the renderer and start its sender thread.
+
+        Args:
+            address_ip (str, optional): The IP address of the X-Plane computer. Defaults to localhost.
+            port (int, optional): The port of the X-Plane computer. Defaults to 49009.
+            max_rate (float, optional): The maximum number of flushes per second. Defaults to 10.0.
+            max_points (int, optional): The maximum number of waypoints drawn at once. Defaults to 500.
+
+        Raises:
+            ValueError: If `max_rate` or `max_points` is not positive.
+        """
+        if max_rate <= 0:
+            raise ValueError("max_rate must be positive.")
+        if max_points <= 0:
+            raise ValueError("max_points must be positive.")
+        self.xp = XPlaneConnect(address_ip, port, 0)
+        self.max_rate = max_rate
+        self.max_points = max_points
+        self._text = None
+        # Waypoints not sent yet, and waypoints currently drawn, oldest first
+        self._points = deque(maxlen=max_points)
+        self._drawn = deque()
+        self._clear = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def queue_text(self, text: str):
+        """Queue a HUD text, replacing the one not sent yet.
+
+        Args:
+            text (str): The text to display."""
+        with self._lock:
+            self._text = text
+        self._pending.set()
+
+    def queue_point(self, latitude: float, longitude: float, altitude: float):
+        """Queue a trajectory waypoint.
+
+        Args:
+            latitude (float): The latitude, in degrees.
+            longitude (float): The longitude, in degrees.
+            altitude (float): The altitude above sea level, in meters."""
+        with self._lock:
+            self._points.append((latitude, longitude, altitude))
+        self._pending.set()
+
+    def clear_points(self):
+        """Remove the trajectory drawn so far and the waypoints not sent yet."""
+        with self._lock:
+            self._points.clear()
+            self._clear = True
+        self._pending.set()
+
+    def _send_points(self, op: int, points: list):
+        """Send waypoints in as few messages as possible.
+
+        Args:
+            op (int): The sendWYPT operation, 1 to add and 2 to remove.
+            points (list): The (latitude, longitude, altitude) waypoints."""
+        for i in range(0, len(points), MAX_POINTS_PER_MESSAGE):
+            self.xp.sendWYPT(op, [value for point in points[i:i + MAX_POINTS_PER_MESSAGE] for value in point])
+
+    def _run(self):
+        """Flush the queue at a capped rate until the renderer is closed."""
+        while True:
+            self._pending.wait()
+            if self._closed:
+                return
+            self._pending.clear()
+            with self._lock:
+                text, self._text = self._text, None
+                points = list(self._points)
+                self._points.clear()
+                clear, self._clear = self._clear, False
+            try:
+                if clear:
+                    self.xp.sendWYPT(3, [])
+                    self._drawn.clear()
+                if points:
+                    # Make room for the new waypoints by removing the oldest ones
+                    overflow = len(self._drawn) + len(points) - self.max_points
+                    removed = [self._drawn.popleft() for _ in range(max(0, overflow))]
+                    self._send_points(2, removed)
+                    self._send_points(1, points)
+                    self._drawn.extend(points)
+                if text is not None:
+                    self.xp.sendTEXT(text)
+            except OSError:
+                # Drawing is best effort, never disturb the training
+                pass
+            sleep(1.0 / self.max_rate)
+
+    def close(self):
+        """Stop the sender thread and close its connection."""
+        self._closed = True
+        self._pending.set()
+        self._thread.join()
+        self.xp.close()
@@ -0,0 +1,392 @@
+# AirGym: A Reinforcement Learning Environment 🚀, GPL-3.0 License
+
+import queue
+import select
+import socket
+import struct
+import threading
+import multiprocessing
+
+import numpy as np
+
+# Every message starts with a tag and the length of its payload
+HEADER = struct.Struct("<4sI")
+# HELO: worker id, observation size, action size
+HELLO = struct.Struct("<III")
+# TRAN: number of transitions, weights version used to collect them
+TRANSITIONS = struct.Struct("<IQ")
+# WGHT: weights version
+WEIGHTS = struct.Struct("<Q")
+
+
+def _recv_exactly(sock: socket.socket, size: int):
+    """Receive exactly `size` bytes from a socket.
+
+    Args:
+        sock (socket.socket): The socket to read from.
+        size (int): The number of bytes to read.
+
+    Returns:
+        bytearray: The bytes read.
+
+    Raises:
+        ConnectionError: If the peer closed the connection."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    while size:
+        received = sock.recv_into(view, size)
+        if received == 0:
+            raise ConnectionError("Connection closed by the peer.")
+        view = view[received:]
+        size -= received
+    return buffer
+
+
+def _recv_message(sock: socket.socket):
+    """Receive a framed message from a socket.
+
+    Args:
+        sock (socket.socket): The socket to read from.
+
+    Returns:
+        bytes: The tag of the message.
+        bytearray: The payload of the message."""
+    tag, size = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return tag, _recv_exactly(sock, size)
+
+
+def _replace(slot: queue.Queue, item):
+    """Put an item in a single-item queue, replacing the one not consumed yet.
+
+    Args:
+        slot (queue.Queue): A queue of size 1.
+        item: The item to put."""
+    while True:
+        try:
+            slot.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                slot.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _send_message(sock: socket.socket, tag: bytes, header: bytes, data: np.ndarray = None):
+    """Send a framed message to a socket.
+
+    Args:
+        sock (socket.socket): The socket to write to.
+        tag (bytes): The tag of the message.
+        header (bytes): The packed header of the payload.
+        data (np.ndarray, optional): A float32 array appended to the payload without copy. Defaults to None."""
+    size = len(header) + (data.nbytes if data is not None else 0)
+    sock.sendall(HEADER.pack(tag, size) + header)
+    if data is not None:
+        sock.sendall(memoryview(data).cast("B"))
+
+
+class RolloutAggregator(object):
+    """Learner-side server collecting the transitions streamed by rollout workers.
+
+    Workers connect over a local TCP socket and stream batches of transitions as raw
+    float32 rows ``[obs, action, reward, next_obs, done]``. Batches are queued as they
+    arrive, so collection never waits for the learner; when the queue is full, the
+    oldest batch is dropped. Policy weights are pushed to every worker asynchronously
+    by one sender thread per worker, which only keeps the latest weights not sent yet.
+    A worker connecting after a broadcast receives the latest weights right away.
+
+    Attributes:
+        address (tuple): The (host, port) the workers must connect to.
+        steps_received (int): The number of transitions received so far, including the dropped ones.
+        steps_dropped (int): The number of transitions dropped because the learner fell behind.
+        batches_dropped (int): The number of batches dropped because the learner fell behind.
+        version (int): The version of the last broadcast weights.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_batches: int = 1024):
+        """Start listening for workers.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on, 0 for any free port. Defaults to 0.
+            max_batches (int, optional): The maximum number of batches waiting for the learner. Defaults to 1024.
+        """
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen()
+        # Wake up regularly so the accepting thread notices `close`
+        self._server.settimeout(0.5)
+        self.address = self._server.getsockname()
+        self.steps_received = 0
+        self.steps_dropped = 0
+        self.batches_dropped = 0
+        self.version = 0
+        # Latest (version, weights), handed to the workers connecting later
+        self._latest = None
+        self._batches = queue.Queue(max_batches)
+        # Connection to each worker -> latest weights waiting to be sent to it
+        self._connections = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        """Accept the workers and start a reader thread for each of them."""
+        while not self._closed:
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn: socket.socket):
+        """Read the batches of one worker until it disconnects.
+
+        Args:
+            conn (socket.socket): The connection to the worker."""
+        try:
+            tag, payload = _recv_message(conn)
+            if tag != b"HELO":
+                raise ConnectionError("Unexpected header: " + str(tag))
+            worker_id, obs_size, action_size = HELLO.unpack(payload)
+            slot = queue.Queue(1)
+            threading.Thread(target=self._send, args=(conn, slot), daemon=True).start()
+            with self._lock:
+                self._connections[conn] = slot
+                if self._latest is not None:
+                    _replace(slot, self._latest)
+            while True:
+                tag, payload = _recv_message(conn)
+                if tag != b"TRAN":
+                    raise ConnectionError("Unexpected header: " + str(tag))
+                size, version = TRANSITIONS.unpack_from(payload)
+                rows = np.frombuffer(payload, dtype=np.float32, offset=TRANSITIONS.size).reshape(size, -1)
+                self._put({
+                    "worker_id": worker_id,
+                    "version": version,
+                    "obs": rows[:, :obs_size],
+                    "action": rows[:, obs_size:obs_size + action_size],
+                    "reward": rows[:, obs_size + action_size],
+                    "next_obs": rows[:, obs_size + action_size + 1:-1],
+                    "done": rows[:, -1],
+                })
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                slot = self._connections.pop(conn, None)
+            if slot is not None:
+                # Stop the sender thread
+                _replace(slot, None)
+            conn.close()
+
+    def _send(self, conn: socket.socket, slot: queue.Queue):
+        """Send the weights queued for one worker until it disconnects.
+
+        Args:
+            conn (socket.socket): The connection to the worker.
+            slot (queue.Queue): The latest weights waiting to be sent, None to stop."""
+        while True:
+            item = slot.get()
+            if item is None:
+                return
+            version, weights = item
+            try:
+                _send_message(conn, b"WGHT", WEIGHTS.pack(version), weights)
+            except OSError:
+                return
+
+    def _put(self, batch: dict):
+        """Queue a batch, dropping the oldest one if the learner falls behind.
+
+        Args:
+            batch (dict): The batch of transitions."""
+        with self._lock:
+            self.steps_received += batch["reward"].shape[0]
+        while True:
+            try:
+                self._batches.put_nowait(batch)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._batches.get_nowait()
+                except queue.Empty:
+                    continue
+                with self._lock:
+                    self.batches_dropped += 1
+                    self.steps_dropped += dropped["reward"].shape[0]
+
+    def get(self, timeout: float = None):
+        """Get the next batch of transitions.
+
+        Args:
+            timeout (float, optional): The maximum time to wait, in seconds. None waits forever. Defaults to None.
+
+        Returns:
+            dict: The batch with `worker_id`, `version`, `obs`, `action`, `reward`, `next_obs` and `done`,
+                or None if no batch arrived in time."""
+        try:
+            return self._batches.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_all(self):
+        """Get every batch received so far without waiting.
+
+        Returns:
+            list: The batches of transitions."""
+        batches = []
+        while True:
+            try:
+                batches.append(self._batches.get_nowait())
+            except queue.Empty:
+                return batches
+
+    @property
+    def num_workers(self):
+        """int: The number of connected workers."""
+        with self._lock:
+            return len(self._connections)
+
+    def broadcast(self, weights: np.ndarray):
+        """Send new policy weights to every connected worker without waiting for them.
+
+        Weights not sent yet to a slow worker are replaced by the new ones.
+
+        Args:
+            weights (np.ndarray): The flat policy weights.
+
+        Returns:
+            int: The version of the weights."""
+        # Copy once, so the learner can keep updating its own array
+        weights = np.array(weights, dtype=np.float32).ravel()
+        with self._lock:
+            self.version += 1
+            version = self.version
+            self._latest = (version, weights)
+            slots = list(self._connections.values())
+        for slot in slots:
+            _replace(slot, (version, weights))
+        return version
+
+    def close(self):
+        """Stop the server and disconnect the workers."""
+        self._closed = True
+        self._server.close()
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for conn, slot in connections.items():
+            _replace(slot, None)
+            conn.close()
+
+
+def _poll_weights(sock: socket.socket):
+    """Read the weights pushed by the aggregator without blocking.
+
+    Args:
+        sock (socket.socket): The connection to the aggregator.
+
+    Returns:
+        int: The version of the latest weights, or None if none arrived.
+        np.ndarray: The latest weights, or None if none arrived."""
+    version, weights = None, None
+    while select.select([sock], [], [], 0)[0]:
+        tag, payload = _recv_message(sock)
+        if tag != b"WGHT":
+            raise ConnectionError("Unexpected header: " + str(tag))
+        version = WEIGHTS.unpack_from(payload)[0]
+        weights = np.frombuffer(payload, dtype=np.float32, offset=WEIGHTS.size)
+    return version, weights
+
+
+def run_worker(address: tuple, worker_id: int, env_fns: list, policy=None, batch_size: int = 256, max_steps: int = None):
+    """Drive one or more environments and stream their transitions to an aggregator.
+
+    Args:
+        address (tuple): The (host, port) of the aggregator.
+        worker_id (int): The id of the worker, reported with each batch.
+        env_fns (list): The functions creating the environments driven by this worker.
+        policy (callable, optional): A function `policy(obs, weights) -> action`. Actions are sampled at random
+            until the first weights are received, or always if None. Defaults to None.
+        batch_size (int, optional): The number of transitions per batch. Defaults to 256.
+        max_steps (int, optional): The number of steps after which the worker stops, None to run until
+            the aggregator closes. Defaults to None."""
+    envs = [env_fn() for env_fn in env_fns]
+    obs_size = int(np.prod(envs[0].observation_space.shape))
+    action_size = int(np.prod(envs[0].action_space.shape))
+    sock = socket.create_connection(address)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    # Columns of a transition row
+    action_start = obs_size
+    reward_col = action_start + action_size
+    next_obs_start = reward_col + 1
+    rows = np.empty((batch_size, 2 * obs_size + action_size + 2), dtype=np.float32)
+    count, steps, i = 0, 0, 0
+    version, weights = 0, None
+    try:
+        _send_message(sock, b"HELO", HELLO.pack(worker_id, obs_size, action_size))
+        observations = [env.reset() for env in envs]
+        while max_steps is None or steps < max_steps:
+            new_version, new_weights = _poll_weights(sock)
+            if new_weights is not None:
+                # A batch only holds transitions collected with the version it carries
+                if count:
+                    _send_message(sock, b"TRAN", TRANSITIONS.pack(count, version), rows[:count])
+                    count = 0
+                version, weights = new_version, new_weights
+            env = envs[i]
+            if policy is None or weights is None:
+                action = env.action_space.sample()
+            else:
+                action = policy(observations[i], weights)
+            next_obs, reward, done, _ = env.step(action)
+            row = rows[count]
+            row[:action_start] = np.ravel(observations[i])
+            row[action_start:reward_col] = np.ravel(action)
+            row[reward_col] = reward
+            row[next_obs_start:-1] = np.ravel(next_obs)
+            row[-1] = done
+            observations[i] = env.reset() if done else next_obs
+            i = (i + 1) % len(envs)
+            count += 1
+            steps += 1
+            if count == batch_size:
+                _send_message(sock, b"TRAN", TRANSITIONS.pack(count, version), rows)
+                count = 0
+        if count:
+            _send_message(sock, b"TRAN", TRANSITIONS.pack(count, version), rows[:count])
+    except (ConnectionError, OSError):
+        # The aggregator is gone, stop collecting
+        pass
+    finally:
+        sock.close()
+        for env in envs:
+            env.close()
+
+
+def start_workers(address: tuple, env_fns: list, policy=None, batch_size: int = 256, max_steps: int = None):
+    """Start one rollout worker process per list of environment functions.
+
+    Args:
+        address (tuple): The (host, port) of the aggregator.
+        env_fns (list): For each worker, the list of functions creating its environments.
+        policy (callable, optional): A picklable function `policy(obs, weights) -> action`. Defaults to None.
+        batch_size (int, optional): The number of transitions per batch. Defaults to 256.
+        max_steps (int, optional): The number of steps after which each worker stops. Defaults to None.
+
+    Returns:
+        list: The started worker processes."""
+    processes = []
+    for worker_id, worker_env_fns in enumerate(env_fns):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(address, worker_id, worker_env_fns, policy, batch_size, max_steps),
+            daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
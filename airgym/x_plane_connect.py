@@ -1,6 +1,18 @@
 import socket
 import struct
 
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def resolveHost(host):
+    """Resolves a hostname once per process, so many connections to the same host
+       only pay for one lookup. The cache is lost with the process: when spawning many
+       short-lived workers, resolve the host once in the parent and pass the IP address.
+    """
+    return socket.gethostbyname(host)
+
+
 class XPlaneConnect(object):
     """XPlaneConnect (XPC) facilitates communication to and from the XPCPlugin."""
     socket = None
@@ -19,7 +31,7 @@ class XPlaneConnect(object):
         # Validate parameters
         xpIP = None
         try:
-            xpIP = socket.gethostbyname(xpHost)
+            xpIP = resolveHost(xpHost)
         except:
             raise ValueError("Unable to resolve xpHost.")
 
@@ -337,14 +349,28 @@ class XPlaneConnect(object):
             Returns: A multidimensional sequence of data representing the values of the requested
              datarefs.
         """
-        # Send request
+        self.requestDREFs(drefs)
+        return self.readDREFs()
+
+    def requestDREFs(self, drefs):
+        """Requests the value of one or more X-Plane datarefs without waiting for the response.
+           The response must then be read with `readDREFs`.
+
+            Args:
+              drefs: The names of the datarefs to get.
+        """
         buffer = struct.pack(b"<4sxB", b"GETD", len(drefs))
         for dref in drefs:
             fmt = "<B{0:d}s".format(len(dref))
             buffer += struct.pack(fmt.encode(), len(dref), dref.encode())
         self.sendUDP(buffer)
 
-        # Read and parse response
+    def readDREFs(self):
+        """Reads the response to a previous `requestDREFs`.
+
+            Returns: A multidimensional sequence of data representing the values of the requested
+             datarefs.
+        """
         buffer = self.readUDP()
         resultCount = struct.unpack_from(b"B", buffer, 5)[0]
         offset = 6
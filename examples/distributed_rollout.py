@@ -0,0 +1,56 @@
+import argparse
+
+import numpy as np
+
+from functools import partial
+
+from airgym.envs import AirGym
+from airgym.fake_xplane import FakeXPlane
+from airgym.rollout import RolloutAggregator, start_workers
+from airgym.x_plane_connect import resolveHost
+
+# One worker per simulator, each worker can drive several environments
+config = {
+    "simulators": [("192.168.1.175", 49009), ("192.168.1.176", 49009)],
+    "batch_size": 256,
+    "total_timesteps": 200000,
+}
+
+parser = argparse.ArgumentParser(description="Collect transitions from several simulators in parallel.")
+parser.add_argument("--fake", action="store_true", help="Use a stand-in simulator on localhost instead of the simulators.")
+
+
+def linear_policy(obs, weights):
+    """A linear policy, the weights are the flattened (4, 9) matrix."""
+    return np.clip(weights.reshape(4, 9) @ obs, -1, 1)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    aggregator = RolloutAggregator()
+    if args.fake:
+        simulators = [FakeXPlane() for _ in config["simulators"]]
+        env_fns = [[partial(AirGym, address_ip=simulator.address[0], port=simulator.address[1])]
+                   for simulator in simulators]
+    else:
+        # Resolve the hosts once here, the workers do not share the lookup cache
+        env_fns = [[partial(AirGym, address_ip=resolveHost(host), port=port)] for host, port in config["simulators"]]
+    workers = start_workers(aggregator.address, env_fns, linear_policy, batch_size=config["batch_size"])
+
+    weights = np.zeros(4 * 9, dtype=np.float32)
+    # Count the transitions the learner saw, batches dropped while it was busy are not in there
+    steps = 0
+    while steps < config["total_timesteps"]:
+        batch = aggregator.get(timeout=10)
+        if batch is None:
+            continue
+        steps += batch["reward"].shape[0]
+        # Replace with a learner update, the workers keep collecting meanwhile
+        weights += 1e-4 * np.random.randn(weights.size).astype(np.float32) * batch["reward"].mean()
+        aggregator.broadcast(weights)
+        print('steps : ', steps, 'dropped : ', aggregator.steps_dropped, 'version : ', batch["version"],
+              'reward : ', batch["reward"].mean())
+
+    aggregator.close()
+    for worker in workers:
+        worker.join()
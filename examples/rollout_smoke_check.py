@@ -0,0 +1,63 @@
+import sys
+
+import numpy as np
+
+from functools import partial
+from time import perf_counter
+
+from airgym.envs import AirGym
+from airgym.fake_xplane import FakeXPlane
+from airgym.rollout import RolloutAggregator, start_workers
+
+# Two workers on localhost, each driving two AirGym instances against a stand-in simulator
+NUM_WORKERS = 2
+MAX_STEPS = 400
+TIMEOUT = 60
+
+
+def constant_policy(obs, weights):
+    """Repeat the first weight on every action, so the batches show which weights were used."""
+    return np.full(4, weights[0])
+
+
+if __name__ == '__main__':
+    # Truncate some answers so the workers also go through the reset in AirGym.step
+    simulator = FakeXPlane(fail_every=50)
+    env_fn = partial(AirGym, address_ip=simulator.address[0], port=simulator.address[1])
+    aggregator = RolloutAggregator()
+    workers = start_workers(aggregator.address, [[env_fn, env_fn]] * NUM_WORKERS, constant_policy,
+                            batch_size=16, max_steps=MAX_STEPS)
+
+    # Wait for the workers to connect, then push weights while they collect
+    deadline = perf_counter() + TIMEOUT
+    batches = []
+    while aggregator.num_workers < NUM_WORKERS and perf_counter() < deadline:
+        batch = aggregator.get(timeout=0.05)
+        if batch is not None:
+            batches.append(batch)
+    version = aggregator.broadcast(np.array([0.5], dtype=np.float32))
+
+    for worker in workers:
+        worker.join(TIMEOUT)
+    # The last batches may still be on their way to the reader threads
+    while aggregator.steps_received < NUM_WORKERS * MAX_STEPS and perf_counter() < deadline:
+        batch = aggregator.get(timeout=0.1)
+        if batch is not None:
+            batches.append(batch)
+    batches += aggregator.get_all()
+    aggregator.close()
+    simulator.close()
+
+    updated = {batch["worker_id"] for batch in batches if batch["version"] == version}
+    print('steps received : ', aggregator.steps_received, 'workers updated : ', sorted(updated))
+    failed = False
+    if aggregator.steps_received != NUM_WORKERS * MAX_STEPS:
+        print('expected {0} steps'.format(NUM_WORKERS * MAX_STEPS))
+        failed = True
+    if len(updated) != NUM_WORKERS:
+        print('the weights did not reach every worker')
+        failed = True
+    if not all(np.allclose(batch["action"], 0.5) for batch in batches if batch["version"] == version):
+        print('a batch mixes transitions collected with other weights')
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,61 @@
+import argparse
+import subprocess
+import sys
+
+from time import perf_counter
+
+parser = argparse.ArgumentParser(description="Measure the import time of airgym and the startup time of many environments.")
+parser.add_argument("--address_ip", default="0.0.0.0")
+parser.add_argument("--port", type=int, default=49009)
+parser.add_argument("--envs", type=int, default=0, help="Number of environments to bring up, 0 to skip.")
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--max_import", type=float, default=0.5, help="Fail if importing takes longer (seconds).")
+parser.add_argument("--max_startup", type=float, default=5.0, help="Fail if bringing up the environments takes longer (seconds).")
+args = parser.parse_args()
+
+# Modules that must only be loaded when their feature is used
+HEAVY_MODULES = ["scipy", "airgym.normalization", "airgym.render", "airgym.rollout", "airgym.fake_xplane"]
+
+
+def import_time(module):
+    """Best wall time of importing `module` in a fresh interpreter, minus the interpreter startup."""
+    def run(code):
+        start = perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        return perf_counter() - start
+    baseline = min(run("pass") for _ in range(args.repeat))
+    return min(run("import " + module) for _ in range(args.repeat)) - baseline
+
+
+failed = False
+
+# Check that importing the environment loads no heavy module
+loaded = subprocess.run([sys.executable, "-c", "import sys, airgym.envs; print(' '.join(sorted(sys.modules)))"],
+                        check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout.split()
+for module in HEAVY_MODULES:
+    if module in loaded:
+        print("import airgym.envs loads {0}".format(module))
+        failed = True
+
+for module in ["airgym", "airgym.envs"]:
+    elapsed = import_time(module)
+    print("import {0}: {1:.3f} s".format(module, elapsed))
+    if elapsed > args.max_import:
+        print("import {0} exceeds the budget of {1:.3f} s".format(module, args.max_import))
+        failed = True
+
+if args.envs > 0:
+    from airgym.envs import AirGym, check_connections
+
+    start = perf_counter()
+    envs = [AirGym(address_ip=args.address_ip, port=args.port, check_connection=False) for _ in range(args.envs)]
+    check_connections(envs)
+    elapsed = perf_counter() - start
+    print("startup of {0} envs: {1:.3f} s".format(args.envs, elapsed))
+    if elapsed > args.max_startup:
+        print("startup exceeds the budget of {0:.3f} s".format(args.max_startup))
+        failed = True
+    for env in envs:
+        env.close()
+
+sys.exit(1 if failed else 0)